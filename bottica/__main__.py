@@ -17,7 +17,12 @@ import sentry_sdk
 import toml
 
 from bottica.bot import run_bot
-from bottica.file import AUDIO_FOLDER, GUILD_SET_FOLDER, SONG_REGISTRY_FILENAME
+from bottica.file import (
+    AUDIO_FOLDER,
+    GUILD_SET_FOLDER,
+    SONG_REGISTRY_FILENAME,
+    ensure_folders,
+)
 from bottica.music.song import FILE_ENCODING, SongCSVDialect, SongKey, open_song_registry
 from bottica.release import release
 from bottica.util import fmt
@@ -36,6 +41,7 @@ MULTIPLIERS = {
 @click.group()
 def cli() -> int:
     """Bottica management CLI."""
+    ensure_folders()
     return 0
 
 
@@ -97,7 +103,7 @@ def clean(verbose: bool) -> None:
         writer = csv.writer(wfile, dialect=SongCSVDialect)
         header_written = False
         for song_info in song_registry:
-            if isfile(join(AUDIO_FOLDER, song_info.filename)):
+            if isfile(song_info.filepath):
                 linked_filenames.add(song_info.filename)
                 known_songs.add(song_info.key)
                 if not header_written:
@@ -211,8 +217,7 @@ def _gather_songs_larger_than(min_size: int) -> Tuple[Set[SongKey], List[str], i
     bytes_removed = 0
     with open_song_registry(SONG_REGISTRY_FILENAME) as song_registry:
         for song_info in song_registry:
-            filepath = join(AUDIO_FOLDER, song_info.filename)
-            file_size = stat(filepath).st_size
+            file_size = stat(song_info.filepath).st_size
             if file_size >= min_size:
                 songs_to_remove.add(song_info.key)
                 files_to_remove.append(song_info.filename)
@@ -1,4 +1,5 @@
 """Metadata file structure"""
+from functools import cache
 from os import makedirs, path
 
 DATA_FOLDER = "data"
@@ -8,10 +9,17 @@ GUILD_CONTEXT_FOLDER = path.join(DATA_FOLDER, ".ctx")
 GUILD_CONFIG_FOLDER = path.join(DATA_FOLDER, ".cfg")
 SONG_REGISTRY_FILENAME = path.join(DATA_FOLDER, "songs.csv")
 
-for folder in (
-    AUDIO_FOLDER,
-    GUILD_SET_FOLDER,
-    GUILD_CONTEXT_FOLDER,
-    GUILD_CONFIG_FOLDER,
-):
-    makedirs(folder, exist_ok=True)
+
+@cache
+def ensure_folders() -> None:
+    """
+    Create the data folders if they don't exist yet.
+    Done once on demand rather than as a side effect of importing this module.
+    """
+    for folder in (
+        AUDIO_FOLDER,
+        GUILD_SET_FOLDER,
+        GUILD_CONTEXT_FOLDER,
+        GUILD_CONFIG_FOLDER,
+    ):
+        makedirs(folder, exist_ok=True)
@@ -27,6 +27,7 @@ class GuildConfig:
 
     def __init__(self, guild_id: int):
         self.guild_id = guild_id
+        self._filename = path.join(GUILD_CONFIG_FOLDER, f"{guild_id}.json")
 
     @classmethod
     def get(cls: Type[GuildConfig], guild_id: int) -> GuildConfig:
@@ -44,4 +45,4 @@ class GuildConfig:
 
     @property
     def filename(self) -> str:
-        return path.join(GUILD_CONFIG_FOLDER, f"{self.guild_id}.json")
+        return self._filename
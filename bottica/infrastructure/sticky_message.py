@@ -4,10 +4,17 @@ If a message is not the freshes in a channel after an update it will be resent.
 """
 from __future__ import annotations
 
+import asyncio
+from time import monotonic
+from typing import Optional
+
 import discord
 
 from bottica.infrastructure.error import atask
 
+# Minimal time between two updates of a message, in seconds.
+MIN_UPDATE_INTERVAL = 1.0
+
 
 class StickyMessage:
     """
@@ -17,24 +24,72 @@ class StickyMessage:
 
     def __init__(self, message: discord.Message):
         self._message = message
+        self._last_update = 0.0
+        # latest update that came too soon after the previous one, applied once it is allowed
+        self._pending_update: tuple[Optional[str], dict] = (None, {})
+        self._pending_handle: Optional[asyncio.TimerHandle] = None
+        # only one update may check and resend the message at a time
+        self._update_lock = asyncio.Lock()
 
     @classmethod
     async def send(cls, channel: discord.abc.Messageable, content=None, **kwargs) -> StickyMessage:
         """Send a new sticky message."""
         message = await channel.send(content, **kwargs)
+        _remember_latest(message)
         return cls(message)
 
     async def update(self, content=None, **kwargs):
-        channel = self._message.channel
-        async for message in channel.history(limit=1):
-            if message != self._message:
+        """
+        Update the message, resending it if it's no longer the latest one in its channel.
+        Updates that come in quick succession are coalesced, only the latest one gets applied.
+        """
+        delay = self._last_update + MIN_UPDATE_INTERVAL - monotonic()
+        if delay > 0:
+            self._pending_update = (content, kwargs)
+            if self._pending_handle is None:
+                self._pending_handle = asyncio.get_running_loop().call_later(
+                    delay,
+                    self._apply_pending_update,
+                )
+            return
+
+        self._last_update = monotonic()
+        await self._update(content, **kwargs)
+
+    def _apply_pending_update(self) -> None:
+        self._pending_handle = None
+        content, kwargs = self._pending_update
+        self._pending_update = (None, {})
+        # counted from scheduling, so direct updates don't race the scheduled one
+        self._last_update = monotonic()
+        atask(self._update(content, **kwargs))
+
+    async def _update(self, content=None, **kwargs):
+        async with self._update_lock:
+            channel = self._message.channel
+            if await self._is_latest():
+                atask(self._message.edit(content=content, **kwargs))
+            else:
                 atask(self._message.delete())
                 self._message = await channel.send(content, **kwargs)
-            else:
-                atask(self._message.edit(content=content, **kwargs))
+                _remember_latest(self._message)
+
+    async def _is_latest(self) -> bool:
+        """Check whether the message is still the freshest one in its channel."""
+        # the client keeps track of the last message id, which spares a history request
+        if getattr(self._message.channel, "last_message_id", None) == self._message.id:
+            return True
 
-    def delete(self):
-        atask(self._message.delete())
+        # the tracked id is stale after the latest message gets deleted, so double check
+        async for message in self._message.channel.history(limit=1):
+            return message == self._message
+        return False
+
+    async def delete(self):
+        if self._pending_handle is not None:
+            self._pending_handle.cancel()
+            self._pending_handle = None
+        await self._message.delete()
 
     # follows the same style as discord API
     # pylint: disable=invalid-name
@@ -45,3 +100,13 @@ class StickyMessage:
     @property
     def channel(self) -> discord.abc.Messageable:
         return self._message.channel
+
+
+def _remember_latest(message: discord.Message) -> None:
+    """Track a sent message as the latest one in its channel before the gateway reports it."""
+    channel = message.channel
+    if not hasattr(channel, "last_message_id"):
+        return
+    # ids grow over time, so never replace the id of a message the gateway already reported
+    if channel.last_message_id is None or channel.last_message_id < message.id:
+        channel.last_message_id = message.id
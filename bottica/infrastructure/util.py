@@ -32,10 +32,12 @@ def convertee_names(converters: Tuple[type, ...]) -> str:
 
 
 def is_listening(member: discord.Member) -> bool:
-    if member.voice is None:
+    voice = member.voice
+    if voice is None:
         return False
 
-    return not any([member.voice.afk, member.voice.deaf, member.voice.self_deaf])
+    # short-circuits instead of building a list of all flags
+    return not (voice.afk or voice.deaf or voice.self_deaf)
 
 
 def has_listening_members(channel: discord.VoiceChannel) -> bool:
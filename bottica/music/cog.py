@@ -1,16 +1,16 @@
 """Music-playing Cog for the bot"""
 
+import asyncio
 import logging
 import random
 from functools import partial
-from os import path
 from typing import Iterable, Optional, cast
 
 import discord
 import discord.ext.commands as cmd
 
 from bottica import response
-from bottica.file import GUILD_CONTEXT_FOLDER, SONG_REGISTRY_FILENAME
+from bottica.file import SONG_REGISTRY_FILENAME
 from bottica.infrastructure.check import guild_only
 from bottica.infrastructure.command import command
 from bottica.infrastructure.config import GuildConfig
@@ -19,7 +19,7 @@ from bottica.infrastructure.friendly_error import FriendlyError
 from bottica.infrastructure.util import has_listening_members
 from bottica.music import check
 from bottica.util import fmt
-from bottica.util.persist import persist
+from bottica.util.persist import persist_in_background
 
 from .context import MusicContext
 from .download import process_request
@@ -42,7 +42,13 @@ class Music(cmd.Cog):
 
     async def cog_unload(self):
         for mctx in self.contexts.values():
-            persist(mctx, mctx.filename)
+            mctx.song_set.flush()
+        # all writes are queued at once and awaited together, errors are reported by the tasks
+        await asyncio.gather(
+            *(mctx.persist_state() for mctx in self.contexts.values()),
+            return_exceptions=True,
+        )
+        self.song_registry.close()
 
     def get_music_context(self, ctx: cmd.Context) -> MusicContext:
         assert ctx.guild is not None
@@ -61,17 +67,16 @@ class Music(cmd.Cog):
     @cmd.Cog.listener()
     async def on_ready(self):
         for guild in self.bot.guilds:
-            filename = path.join(GUILD_CONTEXT_FOLDER, f"{guild.id}.ctx")
-            if path.exists(filename):
-                try:
-                    mctx = await MusicContext.restore(self.bot, guild, self.song_registry)
+            try:
+                mctx = await MusicContext.restore(self.bot, guild, self.song_registry)
+                if mctx is not None:
                     self.contexts[guild.id] = mctx
 
-                # In this case, we indeed want to catch any and all non-exit exceptions and log them
-                # pylint: disable=broad-except
-                except Exception as e:
-                    _logger.exception(e)
-                    _logger.info("guild id: %d", guild.id)
+            # In this case, we indeed want to catch any and all non-exit exceptions and log them
+            # pylint: disable=broad-except
+            except Exception as e:
+                _logger.exception(e)
+                _logger.info("guild id: %d", guild.id)
 
         _logger.info(
             "MusicCog initialized with %d songs and %d states",
@@ -79,6 +84,20 @@ class Music(cmd.Cog):
             len(self.contexts),
         )
 
+    @cmd.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        # the guild might have had the bot before, see on_guild_remove()
+        mctx = await MusicContext.restore(self.bot, guild, self.song_registry)
+        if mctx is not None:
+            self.contexts[guild.id] = mctx
+
+    @cmd.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        # the context is restored from its saved state if the guild ever comes back
+        if mctx := self.contexts.pop(guild.id, None):
+            mctx.song_set.flush()
+            mctx.disconnect()
+
     @cmd.Cog.listener()
     async def on_resumed(self):
         for voice_client in self.bot.voice_clients:
@@ -94,6 +113,9 @@ class Music(cmd.Cog):
         before: discord.VoiceState,
         after: discord.VoiceState,
     ) -> None:
+        if mctx := self.contexts.get(member.guild.id):
+            mctx.invalidate_listeners()
+
         if member == self.bot.user:
             return
 
@@ -160,14 +182,17 @@ class Music(cmd.Cog):
             if idx != 0:
                 songs[0], songs[idx] = songs[idx], songs[0]
 
-        for song in songs:
-            self.song_registry.put(song)
-
-            mctx.song_set.add(song)
-            mctx.song_queue.push(song)
+        self.song_registry.put_many(songs)
+        try:
+            for song in songs:
+                mctx.song_set.add(song)
+                mctx.song_queue.push(song)
 
-            if not mctx.is_playing():
-                await mctx.play_next()
+                if not mctx.is_playing():
+                    await mctx.play_next()
+        finally:
+            # added songs are saved even if playback fails
+            mctx.song_set.flush()
 
     @command(aliases=["pa"])
     @cmd.check(check.bot_has_voice_permission_in_author_channel)
@@ -355,8 +380,9 @@ class Music(cmd.Cog):
         guild_config = GuildConfig.get(ctx.guild.id)
         user = member or ctx.author
         self.song_registry.put(songs[0])
+        self.song_registry.flush()
         guild_config.announcements[user.id] = songs[0].key
-        persist(guild_config, guild_config.filename)
+        atask(asyncio.wrap_future(persist_in_background(guild_config, guild_config.filename)))
 
     @command(
         aliases=["ca", "cleara"],
@@ -373,7 +399,7 @@ class Music(cmd.Cog):
         guild_config = GuildConfig.get(ctx.guild.id)
         user = member or ctx.author
         del guild_config.announcements[user.id]
-        persist(guild_config, guild_config.filename)
+        atask(asyncio.wrap_future(persist_in_background(guild_config, guild_config.filename)))
 
     def get_announcement(self, guild_id: int, member_id: int) -> Optional[SongInfo]:
         """Get the announcement associated with provided member id at the provided guild."""
@@ -8,20 +8,22 @@ import asyncio
 
 import logging
 import os
+import weakref
+from functools import partial
 from os import path
 from typing import Annotated, Optional, cast
 
 import discord
 
-from bottica.file import AUDIO_FOLDER, GUILD_CONTEXT_FOLDER, GUILD_SET_FOLDER
+from bottica.file import GUILD_CONTEXT_FOLDER, GUILD_SET_FOLDER
 from bottica.infrastructure.config import GuildConfig
 from bottica.infrastructure.error import atask
 from bottica.infrastructure.sticky_message import StickyMessage
 from bottica.infrastructure.util import has_listening_members
-from bottica.music.download import download_song
+from bottica.music.download import download_song, prefetch_song, wait_for_prefetch
 from bottica.music.normalize import stream_normalize_ffmpeg_args
-from bottica.util import cmd, fmt
-from bottica.util.persist import PERSISTENT, persist, restore
+from bottica.util import cmd
+from bottica.util.persist import PERSISTENT, persist_in_background, restore_in_background
 
 from .error import AuthorNotInPlayingChannel, InvalidURLError, RestrictedChannel
 from .song import SongInfo, SongQueue, SongRegistry, SongSet
@@ -30,15 +32,32 @@ _logger = logging.getLogger(__name__)
 
 
 DISCARD_FFMPEG_FLUFF = cmd.join(["-vn", "-sn"])
+STREAM_NORMALIZE_OPTIONS = stream_normalize_ffmpeg_args()
+# Displayed in place of the current song while there is nobody to play for.
+# Embeds are only read when sent, so a single instance can be shared.
+_PAUSED_EMBED = discord.Embed(description="...")
+# Delay in seconds used to coalesce bursts of state changes into a single write.
+PERSIST_DELAY = 0.5
 
 
 class SelectSong:
-    shuffle_enabled: Annotated[bool, PERSISTENT] = False
-    radio_enabled: Annotated[bool, PERSISTENT] = False
+    __slots__ = (
+        "shuffle_enabled",
+        "radio_enabled",
+        "_guild_config",
+        "_song_set",
+        "_queue",
+        "_history",
+    )
+
+    shuffle_enabled: Annotated[bool, PERSISTENT]
+    radio_enabled: Annotated[bool, PERSISTENT]
 
     def __init__(self, guild_id: int, registry: SongRegistry) -> None:
         super().__init__()
 
+        self.shuffle_enabled = False
+        self.radio_enabled = False
         self._guild_config = GuildConfig.get(guild_id)
         self._song_set = SongSet(registry, path.join(GUILD_SET_FOLDER, f"{guild_id}.csv"))
         self._queue = SongQueue(registry)
@@ -57,14 +76,17 @@ class SelectSong:
         if self._queue:
             song = self._queue.pop_random() if self.shuffle_enabled else self._queue.pop()
 
-        while len(self._history) > self._guild_config.min_repeat_interval:
-            self._history.pop()
+        history = self._history
+        # the config value is a validating descriptor, so avoid re-reading it every iteration
+        min_repeat_interval = self._guild_config.min_repeat_interval
+        while len(history) > min_repeat_interval:
+            history.pop()
 
         if not song and self.radio_enabled:
-            song = self._song_set.select_random(block_list=self._history)
+            song = self._song_set.select_random(block_list=history)
 
         if song:
-            self._history.push(song)
+            history.push(song)
 
         return song
 
@@ -78,9 +100,25 @@ class SelectSong:
 
 
 class MusicContext(SelectSong):
+    __slots__ = (
+        "text_channel",
+        "_voice_client",
+        "song_message",
+        "_client",
+        "_guild",
+        "_filename",
+        "_current_song",
+        "_to_cleanup",
+        "_persist_handle",
+        "_has_listeners",
+        "_song_message_description",
+        "_after_playback",
+        "__weakref__",
+    )
+
     text_channel: Annotated[discord.TextChannel, PERSISTENT]
-    _voice_client: Annotated[Optional[discord.VoiceClient], PERSISTENT] = None
-    song_message: Annotated[Optional[StickyMessage], PERSISTENT] = None
+    _voice_client: Annotated[Optional[discord.VoiceClient], PERSISTENT]
+    song_message: Annotated[Optional[StickyMessage], PERSISTENT]
 
     def __init__(
         self,
@@ -94,11 +132,20 @@ class MusicContext(SelectSong):
 
         self._client = client
         self._guild = guild
+        self._filename = _context_filename(guild.id)
 
         self._voice_client = voice_client
+        self.song_message = None
+        # description last shown in the sticky song message
+        self._song_message_description: Optional[str] = None
         self._guild_config = GuildConfig.get(guild.id)
         self._current_song: Optional[SongInfo] = None
         self._to_cleanup = ""
+        self._persist_handle: Optional[asyncio.TimerHandle] = None
+        # cached result of has_listening_members(), reset on any voice state change
+        self._has_listeners: Optional[bool] = None
+        # bound once instead of on every played song, weakly to not keep the context alive
+        self._after_playback = partial(_playback_finished, weakref.ref(self))
 
         if text_channel is not None:
             self.text_channel = text_channel
@@ -109,12 +156,15 @@ class MusicContext(SelectSong):
         client: discord.Client,
         guild: discord.Guild,
         registry: SongRegistry,
-    ) -> MusicContext:
+    ) -> Optional[MusicContext]:
+        """Restore previously saved context of provided guild, if there is any."""
+        if not path.exists(_context_filename(guild.id)):
+            return None
+
         # we know the text channel will get loaded, so hackily ignore invalid state
         mctx = cls(client, guild, cast(discord.TextChannel, None), None, registry)
-        task = restore(mctx.filename, mctx, deserializer_opts={"client": client})
-        if task:
-            await task
+
+        await restore_in_background(mctx.filename, mctx, deserializer_opts={"client": client})
 
         if mctx._voice_client is not None:
             await mctx.play_next()
@@ -125,10 +175,9 @@ class MusicContext(SelectSong):
         """Reset context to a clean state ready for a new play attempt."""
         super().clear()
         if self.song_message is not None:
-            self.song_message.delete()
+            atask(self.song_message.delete())
         self.song_message = None
         self.disconnect()
-        persist(self, self.filename)
 
     @property
     def guild_id(self) -> int:
@@ -136,7 +185,27 @@ class MusicContext(SelectSong):
 
     @property
     def filename(self) -> str:
-        return path.join(GUILD_CONTEXT_FOLDER, f"{self._guild.id}.ctx")
+        return self._filename
+
+    def persist_state(self) -> asyncio.Future[None]:
+        """
+        Save the current context state, dropping any scheduled write.
+        The returned future may be awaited to make sure the state is written.
+        """
+        if self._persist_handle is not None:
+            self._persist_handle.cancel()
+            self._persist_handle = None
+        written = asyncio.wrap_future(persist_in_background(self, self.filename))
+        atask(written)
+        return written
+
+    def _schedule_persist(self) -> None:
+        """Schedule a state write, coalescing with any write that is already pending."""
+        if self._persist_handle is None:
+            self._persist_handle = asyncio.get_running_loop().call_later(
+                PERSIST_DELAY,
+                self.persist_state,
+            )
 
     def is_playing(self) -> bool:
         return self._voice_client is not None and self._voice_client.is_playing()
@@ -166,6 +235,8 @@ class MusicContext(SelectSong):
             self._voice_client = await channel.connect()
         else:
             await self._voice_client.move_to(channel)
+        self.invalidate_listeners()
+        self._schedule_persist()
 
     def disconnect(self):
         if self._voice_client is not None:
@@ -173,7 +244,13 @@ class MusicContext(SelectSong):
             atask(self._voice_client.disconnect())
             self._voice_client = None
         self._current_song = None
+        self.invalidate_listeners()
         self._cleanup_source()
+        self.persist_state()
+
+    def invalidate_listeners(self) -> None:
+        """Forget whether anyone is listening, as the voice channel members might have changed."""
+        self._has_listeners = None
 
     async def display_current_song_info(
         self,
@@ -185,77 +262,111 @@ class MusicContext(SelectSong):
 
         if self._current_song is None:
             if self.song_message is not None:
-                self.song_message.delete()
+                atask(self.song_message.delete())
                 self.song_message = None
             return
 
-        duration = fmt.duration(self._current_song.duration)
-        embed = discord.Embed(description=f"{self._current_song.pretty_link} <> {duration}")
+        description = self._current_song.pretty_description
 
         if sticky:
             if self.song_message is None:
+                embed = discord.Embed(description=description)
                 self.song_message = await StickyMessage.send(self.text_channel, embed=embed)
+            elif channel is None and description == self._song_message_description:
+                # automatic refresh with nothing new to show, spare the API calls
+                return
             else:
-                await self.song_message.update(embed=embed)
+                await self.song_message.update(embed=discord.Embed(description=description))
+            self._song_message_description = description
         else:
-            if self.song_message is not None:
-                self.song_message.delete()
-                self.song_message = None
-            atask(self.text_channel.send(embed=embed))
+            previous_message, self.song_message = self.song_message, None
+            atask(self._send_song_info(discord.Embed(description=description), previous_message))
+
+    async def _send_song_info(
+        self,
+        embed: discord.Embed,
+        previous_message: Optional[StickyMessage],
+    ) -> None:
+        """Send a plain song info message, replacing the previous sticky one if any."""
+        if previous_message is not None:
+            await previous_message.delete()
+        await self.text_channel.send(embed=embed)
 
     async def play_next(self) -> None:
         """
         Play the next song in the queue.
         If I'm not playing I will join the issuer's voice channel.
         """
-        if self._voice_client is None or self.voice_channel is None:
+        voice_client = self._voice_client
+        voice_channel = self.voice_channel
+        if voice_client is None or voice_channel is None:
             raise RuntimeError("Bot is not connected to voice to play.")
 
-        if not self._voice_client.is_connected():
+        if not voice_client.is_connected():
             raise RuntimeError("Bot is not connected to a voice channel.")
 
-        if not has_listening_members(self.voice_channel):
+        if self._has_listeners is None:
+            self._has_listeners = has_listening_members(voice_channel)
+
+        if not self._has_listeners:
             # skip playback. It will be attempted again in Cog.on_voice_state_update()
             _logger.debug("playback skipped due to no active members")
             if self.song_message is not None:
-                atask(self.song_message.update(embed=discord.Embed(description="...")))
+                atask(self.song_message.update(embed=_PAUSED_EMBED))
+                self._song_message_description = None
             return
 
-        self._current_song = self.pick_song()
-        persist(self, self.filename)
+        playing = voice_client.is_playing()
+        song = self.pick_song()
+        self._current_song = song
+        self._schedule_persist()
 
-        if self._current_song is None:
+        if song is None:
             # clean up after automatic playback
-            if self.is_playing():
-                self._voice_client.stop()
+            if playing:
+                voice_client.stop()
             if self.song_message is not None:
-                self.song_message.delete()
+                atask(self.song_message.delete())
                 self.song_message = None
             return
 
-        if self.is_playing():
-            self._voice_client.pause()
+        if playing:
+            voice_client.pause()
 
-        _logger.debug("playing %s in %s", self._current_song.key, self._guild.name)
+        _logger.debug("playing %s in %s", song.key, self._guild.name)
         try:
-            audio = await self._audio_source(self._current_song)
+            audio = await self._audio_source(song)
         except InvalidURLError:
-            _logger.warning("Song not available: %s", self._current_song.key)
+            _logger.warning("Song not available: %s", song.key)
             if self.text_channel:
-                msg = f"Sorry. {self._current_song.pretty_link} is not available any more :disappointed:"
+                msg = f"Sorry. {song.pretty_link} is not available any more :disappointed:"
                 atask(self.text_channel.send(embed=discord.Embed(description=msg)))
             atask(self.play_next())
             return
-        self._voice_client.play(audio, after=self._run_after)
+        except TimeoutError:
+            # the download keeps running, moving on would only start more of them
+            _logger.warning("Song took too long to download: %s", song.key)
+            self._current_song = None
+            if self.text_channel:
+                msg = f"Sorry. {song.pretty_link} is taking too long to download :disappointed:"
+                atask(self.text_channel.send(embed=discord.Embed(description=msg)))
+            return
+
+        # the voice client might have changed while the source was being prepared
+        voice_client = self._voice_client
+        if voice_client is None:
+            return
+        voice_client.play(audio, after=self._after_playback)
+
+        # a shuffled queue is popped at random, so the next song is not known yet
+        if not self.shuffle_enabled:
+            next_song = self._queue.peek()
+            if next_song is not None and self._should_cache(next_song):
+                prefetch_song(next_song)
 
         if self.song_message is not None:
             atask(self.display_current_song_info(True))
 
-    def _run_after(self, error: Optional[Exception]) -> None:
-        """Wrapper around _handle_after to ensure thread safety"""
-        future = asyncio.run_coroutine_threadsafe(self._handle_after(error), self._client.loop)
-        future.result()
-
     async def _handle_after(self, error: Optional[Exception]) -> None:
         """Command ran after playback has stopped"""
         self._cleanup_source()
@@ -274,7 +385,7 @@ class MusicContext(SelectSong):
             await self.play_next()
         else:
             if self.song_message is not None:
-                self.song_message.delete()
+                atask(self.song_message.delete())
                 self.song_message = None
             self.disconnect()
 
@@ -295,23 +406,28 @@ class MusicContext(SelectSong):
         Used for correcting state after re-connecting.
         """
         self._voice_client = client
+        self.invalidate_listeners()
 
     async def _audio_source(self, song: SongInfo) -> discord.FFmpegAudio:
-        filepath = path.join(AUDIO_FOLDER, song.filename)
+        filepath = song.filepath
+        await wait_for_prefetch(song)
         if path.exists(filepath):
             return discord.FFmpegOpusAudio(filepath, before_options=DISCARD_FFMPEG_FLUFF)
 
-        cache = (
-            self._guild_config.max_cached_duration == -1
-            or song.duration <= self._guild_config.max_cached_duration
-        )
-        source = await download_song(song, cache)
+        source = await download_song(song, self._should_cache(song))
 
         self._to_cleanup = source
         return discord.FFmpegPCMAudio(
             source,
             before_options=DISCARD_FFMPEG_FLUFF,
-            options=stream_normalize_ffmpeg_args(),
+            options=STREAM_NORMALIZE_OPTIONS,
+        )
+
+    def _should_cache(self, song: SongInfo) -> bool:
+        """Whether provided song should be kept once it is downloaded."""
+        return (
+            self._guild_config.max_cached_duration == -1
+            or song.duration <= self._guild_config.max_cached_duration
         )
 
     def _cleanup_source(self) -> None:
@@ -324,3 +440,23 @@ class MusicContext(SelectSong):
             pass
 
         self._to_cleanup = ""
+
+
+def _playback_finished(
+    mctx_ref: weakref.ReferenceType[MusicContext],
+    error: Optional[Exception],
+) -> None:
+    """
+    Wrapper around MusicContext._handle_after to ensure thread safety.
+
+    Only schedules the handler, so the audio player thread is free to exit
+    instead of blocking until the next song has started playing.
+    """
+    mctx = mctx_ref()
+    if mctx is not None:
+        # pylint: disable=protected-access
+        mctx._client.loop.call_soon_threadsafe(atask, mctx._handle_after(error))
+
+
+def _context_filename(guild_id: int) -> str:
+    return path.join(GUILD_CONTEXT_FOLDER, f"{guild_id}.ctx")
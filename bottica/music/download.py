@@ -1,9 +1,13 @@
 """Song data download utilities"""
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from logging import getLogger
 from os import path
-from typing import NewType, Optional, cast
+from sys import intern
+from time import monotonic
+from typing import Awaitable, NewType, Optional, cast
 
 from yt_dlp import YoutubeDL  # type: ignore
 
@@ -12,13 +16,17 @@ from bottica.infrastructure.error import atask
 from bottica.infrastructure.friendly_error import FriendlyError
 from bottica.music.error import InvalidURLError
 from bottica.music.normalize import normalize_song
-from bottica.util import file
 
 from .song import EXTENSION as SONG_EXTENSION
-from .song import SongInfo
+from .song import SongInfo, SongKey
 
 ReqInfo = NewType("ReqInfo", dict)
 
+REQUEST_CACHE_SIZE = 256
+REQUEST_CACHE_TTL = 300  # seconds
+# How long to wait for a started download to write its first data.
+DOWNLOAD_TIMEOUT = 30  # seconds
+
 _logger = getLogger(__name__)
 
 _loader = YoutubeDL(
@@ -34,6 +42,36 @@ _loader = YoutubeDL(
         "nopart": True,
     }
 )
+# yt-dlp calls block on the network for a long time, so they get their own threads
+# instead of starving other users of the default executor.
+_download_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ytdl")
+# Files that are being awaited to have some data, along with their waiters.
+_awaited_files: dict[str, list["_FileWaiter"]] = {}
+# Songs that are being downloaded ahead of being played, see prefetch_song().
+_prefetches: dict[SongKey, asyncio.Task] = {}
+# Recently processed requests, least recently used first. Only song metadata is kept,
+# expiring stream urls are always resolved anew.
+_processed_requests: OrderedDict[str, tuple[float, tuple[SongInfo, ...]]] = OrderedDict()
+
+
+class _FileWaiter:
+    """Coroutine waiting for a file to be downloaded, notified from the downloading thread."""
+
+    __slots__ = "loop", "event", "status"
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+        # latest reported download status of the file
+        self.status = ""
+
+    def notify(self, status: str) -> None:
+        """Thread-safely report download progress to the waiter."""
+        self.loop.call_soon_threadsafe(self._set_status, status)
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        self.event.set()
 
 
 class DownloadError(FriendlyError):
@@ -56,20 +94,56 @@ async def download_song(song: SongInfo | ReqInfo, keep: bool) -> str:
         raise InvalidURLError()
 
     task = _download_and_normalize if keep else _download
-    atask(task(req))
-
     filename = path.join(
         AUDIO_FOLDER, song.filename.replace(f".{SONG_EXTENSION}", f".{req.get('ext', '')}")
     )
-    await file.wait_until_available(filename, 2)
+    await _wait_until_available(filename, task(req), timeout=DOWNLOAD_TIMEOUT)
 
     return filename
 
 
+def prefetch_song(song: SongInfo) -> None:
+    """
+    Download and normalize provided song in the background, so it is ready once it is played.
+    """
+    if song.key in _prefetches or path.exists(song.filepath):
+        return
+
+    task = asyncio.create_task(_prefetch(song))
+    _prefetches[song.key] = task
+    task.add_done_callback(partial(_prefetch_done, song.key))
+
+
+async def wait_for_prefetch(song: SongInfo) -> None:
+    """
+    Wait until a prefetch of provided song is done, if there is one.
+    Failed prefetches are ignored, the song gets downloaded anew when played.
+    """
+    if task := _prefetches.get(song.key):
+        await asyncio.wait((task,))
+
+
 async def process_request(query: str) -> list[SongInfo]:
     """Process provided query and get the songs it requests in order."""
+    if cached := _processed_requests.get(query):
+        timestamp, cached_songs = cached
+        if monotonic() - timestamp < REQUEST_CACHE_TTL:
+            _processed_requests.move_to_end(query)
+            return list(cached_songs)
+        del _processed_requests[query]
+
+    songs = await _process_request(query)
+
+    _processed_requests[query] = monotonic(), tuple(songs)
+    if len(_processed_requests) > REQUEST_CACHE_SIZE:
+        _processed_requests.popitem(last=False)
+
+    return songs
+
+
+async def _process_request(query: str) -> list[SongInfo]:
     req_info = await asyncio.get_running_loop().run_in_executor(
-        None,
+        _download_pool,
         partial(
             _loader.extract_info,
             query,
@@ -90,12 +164,72 @@ async def process_request(query: str) -> list[SongInfo]:
     return [song_info] if song_info else []
 
 
+async def _wait_until_available(filename: str, download: Awaitable, timeout: float) -> None:
+    """
+    Run provided download in the background until the file has some data written to it.
+    Raises TimeoutError if that doesn't happen within provided timeout.
+    """
+    atask(download)
+    key = path.normpath(filename)
+    if _has_data(key):
+        return
+
+    # the download can't progress before this coroutine yields, so no progress is missed
+    waiter = _FileWaiter()
+    waiters = _awaited_files.setdefault(key, [])
+    waiters.append(waiter)
+    deadline = waiter.loop.time() + timeout
+    try:
+        # progress may be reported before buffered data reaches the file, so check the file itself
+        while not _has_data(key):
+            if waiter.status == "finished":
+                return
+            if waiter.status == "error":
+                raise DownloadError()
+
+            waiter.event.clear()
+            await asyncio.wait_for(waiter.event.wait(), deadline - waiter.loop.time())
+    except asyncio.TimeoutError:
+        raise TimeoutError() from None
+    finally:
+        waiters.remove(waiter)
+        if not waiters and _awaited_files.get(key) is waiters:
+            del _awaited_files[key]
+
+
+def _has_data(filename: str) -> bool:
+    try:
+        return path.getsize(filename) > 0
+    except OSError:
+        return False
+
+
+def _notify_download_progress(progress: dict) -> None:
+    """yt-dlp progress hook, runs on the downloading thread."""
+    status = progress["status"]
+    filename = progress.get("filename", "")
+    if status == "downloading":
+        if not progress.get("downloaded_bytes"):
+            return
+        if progress.get("tmpfilename", filename) != filename:
+            # data goes to a partial or fragment file rather than the awaited one
+            return
+
+    # copied, as waiters are added and removed on their event loop's thread
+    for waiter in tuple(_awaited_files.get(path.normpath(filename), ())):
+        waiter.notify(status)
+
+
+_loader.add_progress_hook(_notify_download_progress)
+
+
 def _extract_song_info(info: ReqInfo) -> Optional[SongInfo]:
     info_type = info.get("_type", "video")
     if info_type not in ("video", "url"):
         return None
 
-    domain = info.get("ie_key", info.get("extractor_key")).lower()
+    # share the domain string with the keys already in the song registry
+    domain = intern(info.get("ie_key", info.get("extractor_key")).lower())
     return SongInfo(
         domain,
         id=info["id"],
@@ -106,7 +240,7 @@ def _extract_song_info(info: ReqInfo) -> Optional[SongInfo]:
 
 async def _get_info(song: SongInfo) -> ReqInfo:
     return await asyncio.get_running_loop().run_in_executor(
-        None,
+        _download_pool,
         partial(
             _loader.extract_info,
             song.link,
@@ -115,6 +249,20 @@ async def _get_info(song: SongInfo) -> ReqInfo:
     )
 
 
+async def _prefetch(song: SongInfo) -> None:
+    req = await _get_info(song)
+    if not req:
+        raise InvalidURLError()
+
+    await _download_and_normalize(req)
+
+
+def _prefetch_done(key: SongKey, task: asyncio.Task) -> None:
+    del _prefetches[key]
+    if not task.cancelled() and (error := task.exception()) is not None:
+        _logger.warning("Could not prefetch %s: %s", key, error)
+
+
 async def _download_and_normalize(req: ReqInfo):
     filename = await _download(req)
     await normalize_song(filename)
@@ -122,7 +270,7 @@ async def _download_and_normalize(req: ReqInfo):
 
 async def _download(req: ReqInfo) -> str:
     ie_info = await asyncio.get_running_loop().run_in_executor(
-        None,
+        _download_pool,
         partial(
             _loader.process_ie_result,
             req,
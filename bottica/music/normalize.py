@@ -1,15 +1,14 @@
 """Loudness-normalization utility."""
-# from asyncio import create_subprocess_shell
 import asyncio
 import json
 import logging
 import os
 import sys
-from asyncio import create_subprocess_shell, subprocess
+from asyncio import create_subprocess_exec, subprocess
 from os import path
-from typing import Any
+from typing import Any, Iterable, Optional
 
-from bottica.file import AUDIO_FOLDER
+from bottica.file import AUDIO_FOLDER, ensure_folders
 from bottica.music.song import EXTENSION as SONG_EXTENSION
 from bottica.util import cmd
 
@@ -42,16 +41,18 @@ async def normalize_song(
     true_peak: float = -2,
     keep_old_file: bool = False,
 ):
-    filename = path.basename(src_file)
-    name, _ = path.splitext(filename)
-    tmp_file = path.join(AUDIO_FOLDER, f"{name}.tmp")
-    dst_file = path.join(AUDIO_FOLDER, f"{name}.{SONG_EXTENSION}")
+    name, _ = path.splitext(path.basename(src_file))
+    dst_stem = path.join(AUDIO_FOLDER, name)
+    tmp_file = f"{dst_stem}.tmp"
+    dst_file = f"{dst_stem}.{SONG_EXTENSION}"
 
     if path.exists(tmp_file) or path.exists(dst_file):
         _logger.warning("Song already normalized: %s", dst_file)
         return
 
     _logger.debug("Normalizing %s => %s", src_file, dst_file)
+    # may run outside of the management cli, eg as this module's entry point
+    ensure_folders()
     await _run_normalization(
         src_file,
         tmp_file,
@@ -69,6 +70,25 @@ async def normalize_song(
             pass
 
 
+async def normalize_songs(
+    src_files: Iterable[str],
+    *,
+    workers: Optional[int] = None,
+    keep_old_file: bool = False,
+):
+    """
+    Normalize provided song files concurrently.
+    Each ffmpeg pass is CPU-bound, so at most `workers` (defaults to cpu count) run at once.
+    """
+    limit = asyncio.Semaphore(workers or os.cpu_count() or 1)
+
+    async def normalize_one(src_file: str):
+        async with limit:
+            await normalize_song(src_file, keep_old_file=keep_old_file)
+
+    await asyncio.gather(*(normalize_one(src_file) for src_file in src_files))
+
+
 async def _run_normalization(
     src_file: str,
     dst_file: str,
@@ -106,14 +126,15 @@ async def _run_first_pass(src_file: str, loudnorm_args: dict) -> dict[str, Any]:
     ]
     # fmt: on
 
-    process = await create_subprocess_shell(
-        cmd.join(pass_cmd),
+    process = await create_subprocess_exec(
+        *pass_cmd,
         stdin=subprocess.DEVNULL,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.PIPE,
     )
-    code = await process.wait()
+    # drain stderr while waiting, ffmpeg would block on a full pipe otherwise
     _, output = await process.communicate()
+    code = process.returncode
     if code != 0:
         raise RuntimeWarning(f"ffmpeg return error code: {code}")
 
@@ -142,8 +163,8 @@ async def _run_second_pass(src_file: str, dst_file: str, loudnorm_args: dict):
         dst_file,
     ]
     # fmt: on
-    process = await create_subprocess_shell(
-        cmd.join(pass_cmd),
+    process = await create_subprocess_exec(
+        *pass_cmd,
         stdin=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
         stdout=subprocess.DEVNULL,
@@ -169,7 +190,7 @@ def _read_output(output: str) -> dict:
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("python3", __name__, "INPUT")
+        print("python3", __name__, "INPUT...")
         sys.exit()
 
-    asyncio.run(normalize_song(sys.argv[1], keep_old_file=True))
+    asyncio.run(normalize_songs(sys.argv[1:], keep_old_file=True))
@@ -5,17 +5,19 @@ from __future__ import annotations
 
 import csv
 import logging
-from collections import deque
+import pickle
 from contextlib import contextmanager
-from dataclasses import asdict, astuple, dataclass
-from os import path
+from dataclasses import dataclass, fields
+from os import SEEK_END, fstat, path, replace
 from random import randrange
-from typing import Callable, Deque, Dict, Generator, Iterable, Iterator, Optional, cast
-from dataclass_csv import DataclassReader
+from sys import intern
+from typing import Callable, Dict, Generator, Iterable, Iterator, KeysView, Optional
+
+from bottica.file import AUDIO_FOLDER
+from bottica.util import fmt
 
 FILE_ENCODING = "utf8"
 EXTENSION = "opus"
-FFMPEG_OPTIONS = {"options": "-vn"}
 
 SongKey = tuple[str, str]
 
@@ -37,46 +39,94 @@ class SongCSVDialect(csv.Dialect):
     strict = True
 
 
-def keystr(key: SongKey) -> str:
-    return " ".join(key)
-
-
-@dataclass(slots=True)
+@dataclass
 class SongInfo:
+    # Declared manually to fit derived values, which are not dataclass fields.
+    __slots__ = ("domain", "id", "duration", "title", "_key", "_filename", "_filepath", "_links")
+
     domain: str
     id: str
     duration: int
     title: str
 
+    def __post_init__(self) -> None:
+        self._key = (self.domain, self.id)
+        self._filename = f"{self.domain}_{self.id}.{EXTENSION}"
+        self._filepath = path.join(AUDIO_FOLDER, self._filename)
+        # link, pretty link and pretty description, computed on first use by _formatted_links()
+        self._links: Optional[tuple[str, str, str]] = None
+
     @property
     def key(self) -> SongKey:
-        return (self.domain, self.id)
+        return self._key
 
     @property
     def filename(self) -> str:
-        return f"{self.domain}_{self.id}.{EXTENSION}"
+        return self._filename
 
     @property
-    def link(self) -> str:
-        pretty_link = _LINKS.get(self.domain)
-        if pretty_link is None:
-            raise NotImplementedError("SongInfo::link", self.domain)
+    def filepath(self) -> str:
+        """
+        Path of the local audio file of the song.
+        """
+        return self._filepath
 
-        return pretty_link.format(self)
+    @property
+    def link(self) -> str:
+        return self._formatted_links()[0]
 
     @property
     def pretty_link(self) -> str:
         """
         Generate a pretty markdown link that consists of a clickable title.
         """
-        return f"[{self.title}]({self.link})"
+        return self._formatted_links()[1]
+
+    @property
+    def pretty_description(self) -> str:
+        """
+        Pretty link followed by the song duration.
+        """
+        return self._formatted_links()[2]
+
+    def _formatted_links(self) -> tuple[str, str, str]:
+        """Compute link based strings of the song only once, as they are often reused."""
+        if self._links is None:
+            link_format = _LINKS.get(self.domain)
+            if link_format is None:
+                raise NotImplementedError("SongInfo::link", self.domain)
+
+            link = link_format.format(self)
+            pretty_link = f"[{self.title}]({link})"
+            self._links = link, pretty_link, f"{pretty_link} <> {fmt.duration(self.duration)}"
+        return self._links
+
+
+# Column names of song registry files
+FIELDS = [field.name for field in fields(SongInfo)]
 
 
 @contextmanager
 def open_song_registry(filename: str) -> Generator[Iterable[SongInfo], None, None]:
     with open(filename, "r", encoding=FILE_ENCODING) as file:
-        reader = DataclassReader(file, SongInfo, dialect=cast(str, SongCSVDialect))
-        yield reader
+        yield (
+            SongInfo(domain, intradomain_id, int(duration), title)
+            for domain, intradomain_id, duration, title in _registry_rows(file)
+        )
+
+
+def _registry_rows(file: Iterable[str]) -> Iterator[list[str]]:
+    """Read rows of a song registry file, validating its header."""
+    reader = csv.reader(file, dialect=SongCSVDialect)
+    header_row = next(reader, None)
+    if header_row is None:
+        # file was empty
+        return iter(())
+
+    if header_row != FIELDS:
+        raise RuntimeError(f"Invalid song registry header: {header_row}")
+
+    return reader
 
 
 class SongRegistry:
@@ -86,16 +136,23 @@ class SongRegistry:
 
     def __init__(self, filename: str) -> None:
         self._data: Dict[SongKey, tuple[int, str]] = {}
+        # songs that were looked up, shared so their cached properties are reused
+        self._cache: Dict[SongKey, SongInfo] = {}
         self._filename = filename
-        self._header_written = False
-        if path.exists(filename):
-            with open_song_registry(filename) as song_registry:
-                for song in song_registry:
-                    self._data[song.key] = (song.duration, song.title)
-            self._header_written = True
-        else:
-            with open(filename, "w", encoding=FILE_ENCODING) as file:
-                assert file
+        # kept open to append new songs, see flush() and close()
+        # pylint: disable=consider-using-with
+        self._file = open(filename, "a+", encoding=FILE_ENCODING)
+        signature = _file_signature(self._file.fileno())
+        data = self._read_cache(signature)
+        if data is None:
+            self._file.seek(0)
+            rows = _registry_rows(self._file)
+            # there are only a few domains, so share their strings among all keys
+            data = {(intern(row[0]), row[1]): (int(row[2]), row[3]) for row in rows}
+            self._write_cache(signature, data)
+        self._data = data
+        self._header_written = self._file.seek(0, SEEK_END) > 0
+        self._writer = csv.writer(self._file, dialect=SongCSVDialect)
 
     def __len__(self) -> int:
         return len(self._data)
@@ -103,29 +160,107 @@ class SongRegistry:
     def __contains__(self, key: SongKey) -> bool:
         return key in self._data
 
+    def keys(self) -> KeysView[SongKey]:
+        return self._data.keys()
+
     def __getitem__(self, key: SongKey) -> SongInfo:
-        info = self._data[key]
-        domain, intradomain_id = key
-        return SongInfo(domain, intradomain_id, *info)
+        song = self._cache.get(key)
+        if song is None:
+            info = self._data[key]
+            domain, intradomain_id = key
+            song = SongInfo(domain, intradomain_id, *info)
+            self._cache[key] = song
+        return song
 
     def get(self, key: SongKey) -> Optional[SongInfo]:
-        domain, intradomain_id = key
-        other_fields = self._data.get(key)
-        if other_fields:
-            return SongInfo(domain, intradomain_id, *other_fields)
+        if key in self._data:
+            return self[key]
         return None
 
     def __iter__(self) -> Generator[SongInfo, None, None]:
         return (self[key] for key in self._data)
 
     def put(self, song: SongInfo) -> None:
-        self._data[song.key] = (song.duration, song.title)
-        with open(self._filename, "a", encoding=FILE_ENCODING) as file:
-            writer = csv.writer(file, dialect=SongCSVDialect)
-            if not self._header_written:
-                writer.writerow(asdict(song).keys())
-                self._header_written = True
-            writer.writerow(astuple(song))
+        """
+        Register provided song. The song is written to the backing file in a buffered manner,
+        call flush() to make sure it is written.
+        """
+        self._writer.writerows(self._register((song,)))
+
+    def put_many(self, songs: Iterable[SongInfo]) -> None:
+        """
+        Register all provided songs, writing them to the backing file at once.
+        """
+        self._writer.writerows(self._register(songs))
+        self._file.flush()
+
+    def _register(self, songs: Iterable[SongInfo]) -> list:
+        """Update registered data with provided songs, returning file rows to write."""
+        rows: list = []
+        for song in songs:
+            info = (song.duration, song.title)
+            if self._data.get(song.key) == info:
+                # already registered, don't grow the file with duplicates
+                continue
+
+            self._data[song.key] = info
+            self._cache.pop(song.key, None)
+            rows.append((song.domain, song.id, song.duration, song.title))
+
+        if rows and not self._header_written:
+            rows.insert(0, FIELDS)
+            self._header_written = True
+        return rows
+
+    def flush(self) -> None:
+        """Write any buffered songs to the backing file."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the backing file, no more songs may be put afterwards."""
+        self._file.flush()
+        self._write_cache(_file_signature(self._file.fileno()), self._data)
+        self._file.close()
+
+    @property
+    def _cache_filename(self) -> str:
+        return f"{self._filename}.cache"
+
+    def _read_cache(self, signature: tuple[int, int]) -> Optional[Dict[SongKey, tuple[int, str]]]:
+        """
+        Load registered data pickled by a previous run, if the registry file hasn't changed since.
+        """
+        try:
+            with open(self._cache_filename, "rb") as file:
+                cached_signature, data = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        # a corrupt or outdated cache is simply rebuilt from the registry file
+        # pylint: disable=broad-except
+        except Exception as e:
+            _logger.warning("Ignoring unreadable song registry cache: %s", e)
+            return None
+
+        if cached_signature != signature:
+            return None
+        return data
+
+    def _write_cache(
+        self, signature: tuple[int, int], data: Dict[SongKey, tuple[int, str]]
+    ) -> None:
+        tmp_filename = f"{self._cache_filename}.tmp"
+        try:
+            with open(tmp_filename, "wb") as file:
+                pickle.dump((signature, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+            replace(tmp_filename, self._cache_filename)
+        except OSError as e:
+            _logger.warning("Could not write song registry cache: %s", e)
+
+
+def _file_signature(fd: int) -> tuple[int, int]:
+    """Modification time and size of an open file, which change whenever it is written to."""
+    stat = fstat(fd)
+    return stat.st_mtime_ns, stat.st_size
 
 
 class _SongKeyCollection:
@@ -134,29 +269,32 @@ class _SongKeyCollection:
     and retreive full song information using a provided registry.
     """
 
+    __slots__ = ("_registry",)
+
     def __init__(self, registry: SongRegistry) -> None:
         self._registry = registry
 
     def _deref(self, song: SongKey) -> SongInfo:
         return self._registry[song]
 
-    def _keys_in(self, file: Iterable[str]) -> Generator[SongKey, None, None]:
+    def _keys_in(self, file: Iterable[str]) -> list[SongKey]:
         reader = csv.reader(file, dialect=SongCSVDialect)
 
-        try:
-            header_row = next(reader)
-        except StopIteration:
+        header_row = next(reader, None)
+        if header_row is None:
             # file was empty
-            return
+            return []
 
         assert list(header_row[:2]) == ["domain", "id"], "invalid song collection backing"
 
-        for row in reader:
-            key = row[0], row[1]
-            if key in self._registry:
-                yield key
-            else:
-                _logger.warning("%s not found in song registry!", key)
+        keys = [(intern(row[0]), row[1]) for row in reader]
+        registered = self._registry.keys()
+        known_keys = [key for key in keys if key in registered]
+        if len(known_keys) != len(keys):
+            missing = set(keys).difference(known_keys)
+            _logger.warning("%d songs not found in song registry: %s", len(missing), missing)
+
+        return known_keys
 
 
 class SongQueue(_SongKeyCollection):
@@ -164,57 +302,82 @@ class SongQueue(_SongKeyCollection):
     Sequence of played songs.
     """
 
-    __slots__ = "_registry", "_head", "_tail", "_duration"
+    __slots__ = "_data", "_head", "_duration"
 
     def __init__(self, registry: SongRegistry) -> None:
         super().__init__(registry)
-        self._data: Deque[SongKey] = deque()
+        # queued keys are _data[_head:], popped ones are dropped in bulk by _compact()
+        self._data: list[SongKey] = []
+        self._head = 0
         self._duration: int = 0
 
     def __len__(self) -> int:
-        return len(self._data)
+        return len(self._data) - self._head
 
     def pop(self) -> Optional[SongInfo]:
         """
         Move the next song to the 'head' position if possible.
         Returns the new head.
         """
-        if self._data:
-            song = self._deref(self._data.popleft())
+        if self._head < len(self._data):
+            song = self._deref(self._data[self._head])
+            self._head += 1
+            self._compact()
             self._duration -= song.duration
             return song
         self._duration = 0
         return None
 
+    def peek(self) -> Optional[SongInfo]:
+        """
+        Get the song that pop() would return, without removing it.
+        """
+        if self._head < len(self._data):
+            return self._deref(self._data[self._head])
+        return None
+
     def pop_random(self) -> Optional[SongInfo]:
         """
         Move a random song from the tail to the 'head' position if possible.
         Returns the new head.
+
+        The last queued song takes the place of the popped one.
         """
-        if self._data:
-            idx = randrange(len(self._data))
-            song = self._deref(self._data[idx])
-            del self._data[idx]
+        data = self._data
+        if self._head < len(data):
+            idx = randrange(self._head, len(data))
+            data[idx], data[-1] = data[-1], data[idx]
+            song = self._deref(data.pop())
+            self._compact()
             self._duration -= song.duration
             return song
         self._duration = 0
         return None
 
+    def _compact(self) -> None:
+        """Drop popped keys once they make up over a half of the list, keeping pops O(1)."""
+        if self._head > len(self._data) // 2:
+            del self._data[: self._head]
+            self._head = 0
+
     def push(self, song: SongInfo) -> None:
         self._duration += song.duration
         self._data.append(song.key)
 
     def extend(self, songs: Iterable[SongInfo]) -> None:
-        for song in songs:
-            self._duration += song.duration
-            self._data.append(song.key)
+        # songs may be a one-shot iterator, but are traversed twice
+        if not isinstance(songs, list | tuple):
+            songs = list(songs)
+        self._data.extend(song.key for song in songs)
+        self._duration += sum(song.duration for song in songs)
 
     def clear(self) -> None:
         self._data.clear()
+        self._head = 0
         self._duration = 0
 
     def __iter__(self) -> Iterator[SongInfo]:
-        return map(self._deref, self._data)
+        return map(self._deref, self._data[self._head :])
 
     @property
     def duration(self) -> int:
@@ -226,33 +389,49 @@ class SongSet(_SongKeyCollection):
     Set of all songs queued within a guild.
     """
 
-    __slots__ = "_registry", "filename", "_data"
+    __slots__ = "filename", "_header_written", "_data", "_keys", "_pending"
 
     def __init__(self, registry: SongRegistry, filename: str) -> None:
         super().__init__(registry)
         self.filename = filename
         self._header_written = False
         self._data: set[SongKey] = set()
-
-        if path.exists(filename):
-            with open(filename, "r", encoding=FILE_ENCODING) as file:
-                self._data = set(self._keys_in(file))
-            self._header_written = True
-        else:
-            with open(filename, "w", encoding=FILE_ENCODING) as file:
-                assert file
+        # same keys as _data, kept in a list so random selection doesn't have to copy the set
+        self._keys: list[SongKey] = []
+        # added keys that are yet to be written to the file
+        self._pending: list[SongKey] = []
+
+        # creates the file if it is missing, in a single open
+        with open(filename, "a+", encoding=FILE_ENCODING) as file:
+            file.seek(0)
+            self._data = set(self._keys_in(file))
+            self._header_written = file.seek(0, SEEK_END) > 0
+        self._keys = list(self._data)
 
     def add(self, song: SongInfo) -> bool:
+        """
+        Add provided song to the set. Returns whether the song is new to the set.
+        New songs are saved to the backing file only once flush() is called.
+        """
         if song.key in self._data:
             return False
         self._data.add(song.key)
+        self._keys.append(song.key)
+        self._pending.append(song.key)
+        return True
+
+    def flush(self) -> None:
+        """Write any added songs to the backing file."""
+        if not self._pending:
+            return
+
         with open(self.filename, "a", encoding=FILE_ENCODING) as file:
             writer = csv.writer(file, dialect=SongCSVDialect)
             if not self._header_written:
                 writer.writerow(["domain", "id"])
                 self._header_written = True
-            writer.writerow(song.key)
-        return True
+            writer.writerows(self._pending)
+        self._pending.clear()
 
     def select_random(
         self,
@@ -264,24 +443,32 @@ class SongSet(_SongKeyCollection):
             if isinstance(block_list, SongQueue):
                 # Known hotpath optimization
                 # pylint: disable=protected-access
-                block_set = set(block_list._data)
+                block_set = set(block_list._data[block_list._head :])
             else:
                 block_set = set(song.key for song in block_list)
 
             if allow_predicate:
-                keys = list(
+                keys = [
                     key
-                    for key in self._data
+                    for key in self._keys
                     if key not in block_set and allow_predicate(self._deref(key))
-                )
+                ]
             else:
-                keys = list(key for key in self._data if key not in block_set)
+                # Partial Fisher-Yates shuffle, draws keys without replacement until
+                # an allowed one is found. Avoids copying all keys for a single pick.
+                keys = self._keys
+                for i in range(len(keys)):
+                    j = randrange(i, len(keys))
+                    keys[i], keys[j] = keys[j], keys[i]
+                    if keys[i] not in block_set:
+                        return self._deref(keys[i])
+                return None
 
         else:
             if allow_predicate:
-                keys = list(key for key in self._data if allow_predicate(self._deref(key)))
+                keys = [key for key in self._keys if allow_predicate(self._deref(key))]
             else:
-                keys = list(key for key in self._data)
+                keys = self._keys
 
         if keys:
             idx = randrange(len(keys))
@@ -13,6 +13,10 @@ from pepver import Version
 from bottica.markdown import Markdown
 from bottica.version import BOT_VERSION
 
+# [tool.poetry] section of pyproject.toml, up to the next section
+_POETRY_SECTION = re.compile(r"^\[tool\.poetry\][ \t]*\n(?:(?!\[).*\n?)*", re.MULTILINE)
+_VERSION_LINE = re.compile(r'^version\s*=\s*"\d+\.\d+\.\d+"[ \t]*$', re.MULTILINE)
+
 
 @click.command()
 @click.argument(
@@ -130,22 +134,16 @@ def _prepare_changelog(version: Version) -> Tuple[str, Markdown]:
 
 
 def _update_files(version: Version, changelog: Markdown) -> None:
-    with (
-        open("pyproject.toml", "r", encoding="utf8") as rfile,
-        open("pyproject.new.toml", "w", encoding="utf8") as wfile,
-    ):
-        section = ""
-
-        for line in rfile:
-            if section_match := re.fullmatch(r"\[(?P<section>[\w\.]+)\]", line.strip()):
-                section = section_match.group("section")
-
-            is_version_line = re.fullmatch(r'version\s*=\s*"\d+\.\d+\.\d+"', line.strip())
-            if is_version_line and section == "tool.poetry":
-                wfile.write(f'version = "{version}"\n')
-                continue
-
-            wfile.write(line)
+    with open("pyproject.toml", "r", encoding="utf8") as file:
+        pyproject = file.read()
+
+    def update_version(section: re.Match) -> str:
+        return _VERSION_LINE.sub(f'version = "{version}"', section.group(), count=1)
+
+    pyproject = _POETRY_SECTION.sub(update_version, pyproject, count=1)
+
+    with open("pyproject.new.toml", "w", encoding="utf8") as file:
+        file.write(pyproject)
 
     os.replace("pyproject.new.toml", "pyproject.toml")
 
@@ -12,8 +12,9 @@ ToT = TypeVar("ToT")
 
 
 async def discord_voice_client(value: int, opts: dict) -> discord.VoiceClient:
-    client: discord.Client = opts["client"]
-    channel = cast(discord.VoiceChannel, client.get_channel(value))
+    channel = await _get_or_fetch_channel(opts["client"], value)
+    if not isinstance(channel, discord.VoiceChannel):
+        raise RuntimeError(f"Voice channel {value} is not available")
     return await channel.connect()
 
 
@@ -23,12 +24,21 @@ def discord_text_channel(value: int, opts: dict) -> discord.TextChannel:
 
 
 async def sticky_message(value: Tuple[int, int], opts: dict) -> StickyMessage:
-    client: discord.Client = opts["client"]
-    channel = cast(discord.TextChannel, client.get_channel(value[0]))
+    channel = await _get_or_fetch_channel(opts["client"], value[0])
+    if not isinstance(channel, discord.TextChannel):
+        raise RuntimeError(f"Text channel {value[0]} is not available")
     message = await channel.fetch_message(value[1])
     return StickyMessage(message)
 
 
+async def _get_or_fetch_channel(client: discord.Client, channel_id: int) -> Any:
+    """Get the channel from client cache, only fetching it if it is not cached."""
+    channel = client.get_channel(channel_id)
+    if channel is None:
+        channel = await client.fetch_channel(channel_id)
+    return channel
+
+
 def optional(
     deserializer: Callable[[FromT, dict], ToT],
 ) -> Callable[[Optional[FromT], dict], Optional[ToT]]:
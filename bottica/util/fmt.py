@@ -1,5 +1,6 @@
 """Utilities for formatting different data types"""
 
+from functools import lru_cache
 from typing import Iterable
 
 
@@ -11,7 +12,14 @@ def onoff(val: bool) -> str:
     return "on" if val else "off"
 
 
+# song durations repeat a lot, and the result is a small string
+@lru_cache(maxsize=4096)
 def duration(seconds: int) -> str:
+    if 0 <= seconds < 3600:
+        # most songs are shorter than an hour
+        minutes, seconds = divmod(seconds, 60)
+        return f"{minutes:02d}:{seconds:02d}"
+
     minutes, seconds = divmod(seconds, 60)
     hours, minutes = divmod(minutes, 60)
     days, hours = divmod(hours, 24)
@@ -3,6 +3,8 @@
 import asyncio
 import json
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from importlib import import_module
 from inspect import getmro, isawaitable
 from os import PathLike
@@ -19,11 +21,15 @@ class _Persistent:
 
 
 _logger = logging.getLogger(__name__)
+# A single thread performs all writes, which keeps them ordered and off the event loop.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
 
 Serializer = Callable[[Any], Any]
 Deserializer = Callable[[Any, dict], Any]
 # Mark a value as persistent, ie one that should be serialized.
 PERSISTENT = _Persistent()
+# Persistent fields of already inspected types, see _persistent_fields().
+_fields_by_type: dict[type, tuple[tuple[str, Any], ...]] = {}
 
 
 # I know what I'm doing :anger:
@@ -36,24 +42,11 @@ def marshall(
     """Take any fields annotated as persistent and make sure they are serializeable."""
     data = {}
 
-    for cls in reversed(getmro(type(obj))):
-        if cls.__module__ == "__builtin__":
-            continue
-
-        hints = get_type_hints(
-            cls,
-            globalns=vars(import_module(type(obj).__module__)),
-            include_extras=True,
-        )
-
-        for field, hint in hints.items():
-            if PERSISTENT not in getattr(hint, "__metadata__", ()):
-                continue
-            field_type = getattr(hint, "__origin__", hint)
-            if serializer := serializers.get(field_type) or DEFAULT_SERIALIZERS.get(field_type):
-                data[field] = serializer(getattr(obj, field))
-            else:
-                data[field] = getattr(obj, field)
+    for field, field_type in _persistent_fields(type(obj)):
+        if serializer := serializers.get(field_type) or DEFAULT_SERIALIZERS.get(field_type):
+            data[field] = serializer(getattr(obj, field))
+        else:
+            data[field] = getattr(obj, field)
 
     return data
 
@@ -68,36 +61,24 @@ def unmarshall(
     """Read data from provided serialized dictionary into given object."""
     tasks = []
 
-    for cls in reversed(getmro(type(obj))):
-        if cls.__module__ in ["builtins", "__builtin"]:
+    for field, field_type in _persistent_fields(type(obj)):
+        if field not in data:
             continue
 
-        hints = get_type_hints(
-            cls,
-            globalns=vars(import_module(type(obj).__module__)),
-            include_extras=True,
-        )
-        for field, hint in hints.items():
-            if field not in data:
-                continue
-            if PERSISTENT not in getattr(hint, "__metadata__", ()):
-                continue
-
-            field_type = getattr(hint, "__origin__", hint)
-            try:
-                if deserializer := deserializers.get(field_type) or DEFAULT_DESERIALIZERS.get(
-                    field_type
-                ):
-                    value = deserializer(data[field], deserializer_opts)
-                    if isawaitable(value):
-                        tasks.append(asyncio.create_task(_wait_and_set(obj, field, value)))
-                    setattr(obj, field, value)
-                else:
-                    setattr(obj, field, data[field])
-            # that's the whole point :anger:
-            # pylint: disable=broad-except
-            except Exception as e:
-                _logger.exception(e)
+        try:
+            if deserializer := deserializers.get(field_type) or DEFAULT_DESERIALIZERS.get(
+                field_type
+            ):
+                value = deserializer(data[field], deserializer_opts)
+                if isawaitable(value):
+                    tasks.append(asyncio.create_task(_wait_and_set(obj, field, value)))
+                setattr(obj, field, value)
+            else:
+                setattr(obj, field, data[field])
+        # that's the whole point :anger:
+        # pylint: disable=broad-except
+        except Exception as e:
+            _logger.exception(e)
 
     if tasks:
         return asyncio.gather(*tasks)
@@ -105,6 +86,31 @@ def unmarshall(
     return None
 
 
+def _persistent_fields(obj_type: type) -> tuple[tuple[str, Any], ...]:
+    """
+    Find the names and types of fields annotated as persistent on provided type.
+
+    Type hints are resolved only once per type, as annotations don't change at runtime.
+    """
+    if (cached := _fields_by_type.get(obj_type)) is not None:
+        return cached
+
+    fields: dict[str, Any] = {}
+    globalns = vars(import_module(obj_type.__module__))
+
+    for cls in reversed(getmro(obj_type)):
+        if cls.__module__ == "builtins":
+            continue
+
+        hints = get_type_hints(cls, globalns=globalns, include_extras=True)
+        for field, hint in hints.items():
+            if PERSISTENT in getattr(hint, "__metadata__", ()):
+                fields[field] = getattr(hint, "__origin__", hint)
+
+    _fields_by_type[obj_type] = tuple(fields.items())
+    return _fields_by_type[obj_type]
+
+
 def persist(
     obj: object,
     filename: str | PathLike,
@@ -114,9 +120,25 @@ def persist(
     """
     Save data from given object to the provided file.
     The data can later be restored from the file.
+
+    The file is replaced atomically, so an interrupted write never leaves it corrupted.
+    """
+    persist_in_background(obj, filename, serializers=serializers).result()
+
+
+def persist_in_background(
+    obj: object,
+    filename: str | PathLike,
+    *,
+    serializers: dict[type | TypeAlias, Serializer] = {},
+) -> Future[None]:
     """
-    with open(filename, "w", encoding="utf8") as file:
-        json.dump(marshall(obj, serializers=serializers), file)
+    Take a snapshot of given object and save it to the provided file on a background thread.
+
+    All writes happen in submission order, so the latest snapshot is always the one that remains.
+    """
+    data = json.dumps(marshall(obj, serializers=serializers)).encode("utf8")
+    return _writer.submit(_write_atomically, filename, data)
 
 
 def restore(
@@ -129,12 +151,40 @@ def restore(
     """
     Restore saved data from provided file.
     """
-    with open(filename, "r", encoding="utf8") as file:
-        data = json.load(file)
-
+    data = _read(filename)
     return unmarshall(data, obj, deserializers=deserializers, deserializer_opts=deserializer_opts)
 
 
+async def restore_in_background(
+    filename: str | PathLike,
+    obj: object,
+    *,
+    deserializers: dict[type | TypeAlias, Deserializer] = {},
+    deserializer_opts: dict = {},
+) -> None:
+    """
+    Restore saved data from provided file, reading it on a background thread.
+    """
+    data = await asyncio.get_running_loop().run_in_executor(None, _read, filename)
+    task = unmarshall(data, obj, deserializers=deserializers, deserializer_opts=deserializer_opts)
+    if task:
+        await task
+
+
+def _read(filename: str | PathLike) -> dict:
+    with open(filename, "rb") as file:
+        return json.loads(file.read())
+
+
+def _write_atomically(filename: str | PathLike, data: bytes) -> None:
+    tmp_filename = f"{os.fspath(filename)}.tmp"
+    with open(tmp_filename, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_filename, filename)
+
+
 async def _wait_and_set(obj: object, name: str, value: Awaitable):
     value = await value
     setattr(obj, name, value)
@@ -1,6 +1,6 @@
 """Collection of convenient serializers used for data persistence."""
 
-from typing import Any, Callable, Optional, Tuple, TypeAlias, TypeVar
+from typing import Any, Callable, Optional, Tuple, TypeAlias, TypeVar, cast
 
 import discord
 
@@ -19,8 +19,8 @@ def discord_text_channel(value: discord.TextChannel) -> int:
 
 
 def sticky_message(value: StickyMessage) -> Tuple[int, int]:
-    assert isinstance(value.channel, discord.TextChannel)
-    return value.channel.id, value.id
+    # sticky messages are only ever sent to text channels
+    return cast(discord.TextChannel, value.channel).id, value.id
 
 
 def optional(
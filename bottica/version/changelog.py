@@ -4,6 +4,9 @@ A utility for parsing and interpreting the changelog.
 Expects https://keepachangelog.com markdown file format.
 """
 
+import os
+import re
+from functools import lru_cache
 from typing import Dict
 
 import discord
@@ -13,15 +16,16 @@ from bottica.markdown import Markdown
 
 CHANGELOG_FILENAME = "changelog.md"
 _INVALID_VERSION = Version(0)
+# Heading of a released version section, as opposed to [Unreleased] or other headings
+_VERSION_HEADING = re.compile(r"## (?P<version>\d\S*)\s*")
 
 
 def parse_latest_version() -> Version:
     with open(CHANGELOG_FILENAME, "r", encoding="utf8") as changelog_file:
         for line in changelog_file:
-            if line.startswith("## "):
+            if match := _VERSION_HEADING.fullmatch(line):
                 try:
-                    clean_line = line.removeprefix("## ").strip()
-                    return Version.parse(clean_line)
+                    return Version.parse(match.group("version"))
                 except ValueError:
                     continue
 
@@ -29,14 +33,16 @@ def parse_latest_version() -> Version:
 
 
 def parse_changes_since(previous_version: Version) -> Dict[Version, Dict[str, str]]:
-    with open(CHANGELOG_FILENAME, "r", encoding="utf8") as changelog_file:
-        changelog = Markdown.parse(changelog_file)
-
+    changelog = _parse_changelog()
     changes: Dict[Version, Dict[str, str]] = {}
 
     # looks like a false-positive
     # pylint:disable=not-an-iterable
     for section in changelog[0]:
+        if not section.title[:1].isdigit():
+            # skip parsing headings that can't be versions, such as [Unreleased]
+            continue
+
         try:
             version = Version.parse(section.title)
         except ValueError:
@@ -70,6 +76,17 @@ def compose_changelog_message(changelog: Dict[Version, Dict[str, str]]) -> disco
     return embed
 
 
+def _parse_changelog() -> Markdown:
+    """Parse the changelog, reusing the previous result while the file is unchanged."""
+    return _parse_changelog_version(os.stat(CHANGELOG_FILENAME).st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _parse_changelog_version(_mtime: int) -> Markdown:
+    with open(CHANGELOG_FILENAME, "r", encoding="utf8") as changelog_file:
+        return Markdown.parse(changelog_file)
+
+
 def _compose_subsection_dict(section: Markdown) -> Dict[str, str]:
     result: Dict[str, str] = {}
     if section.content:
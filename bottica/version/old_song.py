@@ -1,10 +1,10 @@
 """Old SongInfo structure for migration-capability"""
 import csv
-from dataclasses import asdict, astuple
 from os import path
 
 from bottica.file import DATA_FOLDER
-from bottica.music.song import FILE_ENCODING, SongCSVDialect, SongInfo, SongKey
+from bottica.music.song import FIELDS as SONG_FIELDS
+from bottica.music.song import FILE_ENCODING, SongCSVDialect, SongKey
 
 OLD_SONG_REGISTRY_FILENAME = path.join(DATA_FOLDER, "songs.txt")
 
@@ -22,12 +22,12 @@ def convert_old_song_registry(old_filename: str, new_filename: str):
         header_exists = False
 
         for line in old_file:
-            song = _parse_old_song_line(line)
+            row = _parse_old_song_line(line)
             if not header_exists:
-                writer.writerow(asdict(song).keys())
+                writer.writerow(SONG_FIELDS)
                 header_exists = True
 
-            writer.writerow(astuple(song))
+            writer.writerow(row)
 
 
 def convert_old_song_set(old_filename: str, new_filename: str):
@@ -45,10 +45,10 @@ def convert_old_song_set(old_filename: str, new_filename: str):
             writer.writerow(song_key)
 
 
-def _parse_old_song_line(line: str) -> SongInfo:
+def _parse_old_song_line(line: str) -> tuple[str, str, int, str]:
+    """Parse an old song line straight into a row of the current format."""
     domain, intradomain_id, _, dur, title = line.strip().split(maxsplit=4)
-    duration = int(dur)
-    return SongInfo(domain, intradomain_id, duration, title)
+    return domain, intradomain_id, int(dur), title
 
 
 def _parse_old_song_key(line: str) -> SongKey:
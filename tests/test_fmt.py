@@ -0,0 +1,12 @@
+"""Unit tests for fmt module"""
+from bottica.util import fmt
+
+
+def test_duration() -> None:
+    assert fmt.duration(0) == "00:00"
+    assert fmt.duration(59) == "00:59"
+    assert fmt.duration(3599) == "59:59"
+    assert fmt.duration(3600) == "1:00:00"
+    assert fmt.duration(86399) == "23:59:59"
+    assert fmt.duration(90061) == "1d 1:01:01"
+    assert fmt.duration(86400) == "1d 00:00"
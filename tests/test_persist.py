@@ -2,7 +2,7 @@
 from pathlib import Path
 
 from bottica.infrastructure.config import GuildConfig
-from bottica.util.persist import persist, restore
+from bottica.util.persist import persist, persist_in_background, restore
 
 
 def test_persist_guild_config(tmp_path: Path) -> None:
@@ -17,3 +17,28 @@ def test_persist_guild_config(tmp_path: Path) -> None:
     restore(filename, loaded)
 
     assert original.announcements == loaded.announcements
+
+
+def test_persist_leaves_no_temporary_file(tmp_path: Path) -> None:
+    filename = tmp_path / "test.json"
+
+    config = GuildConfig(0)
+    persist(config, filename)
+    persist(config, filename)
+
+    assert [path.name for path in tmp_path.iterdir()] == ["test.json"]
+
+
+def test_persist_in_background_keeps_latest(tmp_path: Path) -> None:
+    filename = tmp_path / "test.json"
+
+    config = GuildConfig(0)
+    config.music_channels = [1]
+    persist_in_background(config, filename)
+    config.music_channels = [2]
+    persist_in_background(config, filename).result()
+
+    loaded = GuildConfig(0)
+    restore(filename, loaded)
+
+    assert loaded.music_channels == [2]
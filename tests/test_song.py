@@ -0,0 +1,104 @@
+"""Unit tests for song module"""
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from bottica.music.song import SongInfo, SongQueue, SongRegistry, SongSet
+
+
+@pytest.fixture
+def songs() -> list[SongInfo]:
+    """Songs with ascending durations, so they can be sorted back into order."""
+    return [SongInfo("youtube", str(i), i, f"Song {i}") for i in range(5)]
+
+
+@pytest.fixture
+def registry_filename(tmp_path: Path) -> Path:
+    return tmp_path / "songs.csv"
+
+
+@pytest.fixture
+def registry(registry_filename: Path, songs: list[SongInfo]) -> Generator[SongRegistry, None, None]:
+    """Registry that knows all the songs."""
+    registry = SongRegistry(str(registry_filename))
+    registry.put_many(songs)
+    yield registry
+    registry.close()
+
+
+def test_song_registry_reload(registry_filename: Path) -> None:
+    songs = [
+        SongInfo("youtube", "a;b", 10, 'Quoted; "title"'),
+        SongInfo("youtube", "c", 3600, "Plain title"),
+    ]
+
+    registry = SongRegistry(str(registry_filename))
+    for song in songs:
+        registry.put(song)
+    registry.close()
+
+    loaded = SongRegistry(str(registry_filename))
+    loaded.close()
+
+    assert list(loaded) == songs
+
+
+def test_song_registry_cache_follows_file(registry_filename: Path, songs: list[SongInfo]) -> None:
+    registry = SongRegistry(str(registry_filename))
+    registry.put_many(songs)
+    registry.close()
+    assert registry_filename.with_name("songs.csv.cache").exists()
+
+    # changes made to the registry file by other means invalidate the cache
+    with registry_filename.open("a", encoding="utf8") as file:
+        file.write("youtube;new;20;New title\n")
+
+    loaded = SongRegistry(str(registry_filename))
+    loaded.close()
+
+    assert list(loaded) == songs + [SongInfo("youtube", "new", 20, "New title")]
+
+
+def test_song_registry_put_many_skips_known(
+    registry: SongRegistry, registry_filename: Path, songs: list[SongInfo]
+) -> None:
+    registry.put_many(songs)
+
+    assert len(registry_filename.read_text("utf8").splitlines()) == 1 + len(songs)
+
+
+def test_song_queue_pop_order(registry: SongRegistry, songs: list[SongInfo]) -> None:
+    queue = SongQueue(registry)
+    queue.extend(songs)
+    popped = [queue.pop() for _ in range(3)]
+    assert queue.peek() == songs[3]
+    queue.push(songs[0])
+
+    assert popped == songs[:3]
+    assert list(queue) == [songs[3], songs[4], songs[0]]
+    assert queue.duration == 3 + 4 + 0
+
+
+def test_song_queue_pop_random(registry: SongRegistry, songs: list[SongInfo]) -> None:
+    queue = SongQueue(registry)
+    queue.extend(songs)
+    queue.pop()
+    popped = [queue.pop_random() for _ in range(4)]
+
+    assert sorted(popped, key=lambda song: song.duration) == songs[1:]
+    assert len(queue) == 0
+    assert queue.pop_random() is None
+    assert queue.duration == 0
+
+
+def test_song_set_flush(registry: SongRegistry, songs: list[SongInfo], tmp_path: Path) -> None:
+    song_set = SongSet(registry, str(tmp_path / "set.csv"))
+    for song in songs:
+        song_set.add(song)
+    assert not song_set.add(songs[0])
+    song_set.flush()
+
+    loaded = SongSet(registry, str(tmp_path / "set.csv"))
+
+    assert sorted(loaded, key=lambda song: song.duration) == songs